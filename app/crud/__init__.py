@@ -1,11 +1,15 @@
 from app.crud.user import (
+    clear_user_cache,
     create_user,
     delete_user,
     get_barbers,
     get_user,
     get_user_by_email,
+    get_user_by_email_or_username,
     get_user_by_username,
+    get_user_credentials_by_email,
     get_users,
+    update_password_hash,
     update_user,
 )
 
@@ -13,9 +17,13 @@ __all__ = [
     "get_user",
     "get_user_by_email",
     "get_user_by_username",
+    "get_user_by_email_or_username",
+    "get_user_credentials_by_email",
     "get_users",
     "get_barbers",
     "create_user",
     "update_user",
+    "update_password_hash",
     "delete_user",
+    "clear_user_cache",
 ]
@@ -1,83 +1,192 @@
+from dataclasses import dataclass
+from threading import Lock
 from typing import List, Optional
 
+from cachetools import TTLCache, cached
+from cachetools.keys import hashkey
+from sqlalchemy import Row, delete, insert, select, update
 from sqlalchemy.orm import Session
 
 from app.models.user import User
 from app.schemas.user import UserCreate, UserUpdate
 from app.utils.auth import get_password_hash
 
+# Columns exposed by the user response schema, used by the list queries
+_USER_PUBLIC_COLUMNS = (
+    User.id,
+    User.email,
+    User.username,
+    User.first_name,
+    User.last_name,
+    User.phone_number,
+    User.is_active,
+    User.is_barber,
+    User.created_at,
+    User.updated_at,
+)
+
+# Columns of UserCredentials, in field order
+_USER_CREDENTIALS_COLUMNS = (
+    User.id,
+    User.hashed_password,
+    User.is_barber,
+    User.is_active,
+)
+
+
+@dataclass(frozen=True)
+class UserCredentials:
+    """Detached snapshot of the user fields a login needs."""
+
+    id: int
+    hashed_password: str
+    is_barber: bool
+    is_active: bool
+
+
+# Short-lived cache for the login lookup, cleared whenever users change. Holds
+# plain records, never ORM objects tied to the session that loaded them.
+_user_cache_lock = Lock()
+_credentials_by_email = TTLCache(maxsize=2048, ttl=1)
+
+
+def clear_user_cache() -> None:
+    """Drop all cached user lookups."""
+    with _user_cache_lock:
+        _credentials_by_email.clear()
+
 
 def get_user(db: Session, user_id: int) -> Optional[User]:
     """Get a user by ID."""
-    return db.query(User).filter(User.id == user_id).first()
+    return db.execute(select(User).where(User.id == user_id)).scalar_one_or_none()
 
 
 def get_user_by_email(db: Session, email: str) -> Optional[User]:
     """Get a user by email."""
-    return db.query(User).filter(User.email == email).first()
+    return db.execute(select(User).where(User.email == email)).scalar_one_or_none()
+
+
+@cached(
+    _credentials_by_email,
+    key=lambda db, email: hashkey(email),
+    lock=_user_cache_lock,
+)
+def get_user_credentials_by_email(
+    db: Session, email: str
+) -> Optional[UserCredentials]:
+    """Get the login fields of a user by email."""
+    stmt = select(*_USER_CREDENTIALS_COLUMNS).where(User.email == email)
+    row = db.execute(stmt).one_or_none()
+    return UserCredentials(*row) if row is not None else None
 
 
 def get_user_by_username(db: Session, username: str) -> Optional[User]:
     """Get a user by username."""
-    return db.query(User).filter(User.username == username).first()
+    stmt = select(User).where(User.username == username)
+    return db.execute(stmt).scalar_one_or_none()
+
+
+def get_user_by_email_or_username(
+    db: Session, email: str, username: str
+) -> Optional[User]:
+    """Get a user matching either the email or the username.
+
+    An email match is preferred when the two values belong to different users.
+    """
+    stmt = (
+        select(User)
+        .where((User.email == email) | (User.username == username))
+        .order_by((User.email == email).desc())
+        .limit(1)
+    )
+    return db.execute(stmt).scalar_one_or_none()
 
 
-def get_users(db: Session, skip: int = 0, limit: int = 100) -> List[User]:
-    """Get a list of users."""
-    return db.query(User).offset(skip).limit(limit).all()
+def get_users(db: Session, skip: int = 0, limit: int = 100) -> List[Row]:
+    """Get a list of users, loading only the public columns."""
+    stmt = select(*_USER_PUBLIC_COLUMNS).offset(skip).limit(limit)
+    return db.execute(stmt).all()
 
 
-def get_barbers(db: Session, skip: int = 0, limit: int = 100) -> List[User]:
-    """Get a list of barbers."""
-    return db.query(User).filter(User.is_barber).offset(skip).limit(limit).all()
+def get_barbers(db: Session, skip: int = 0, limit: int = 100) -> List[Row]:
+    """Get a list of barbers, loading only the public columns."""
+    stmt = (
+        select(*_USER_PUBLIC_COLUMNS)
+        .where(User.is_barber)
+        .offset(skip)
+        .limit(limit)
+    )
+    return db.execute(stmt).all()
 
 
 def create_user(db: Session, user: UserCreate) -> User:
     """Create a new user."""
-    db_user = User(
-        email=user.email,
-        username=user.username,
-        first_name=user.first_name,
-        last_name=user.last_name,
-        phone_number=user.phone_number,
-        hashed_password=get_password_hash(user.password),
-        is_barber=user.is_barber,
+    # Insert and load the generated columns in a single INSERT ... RETURNING
+    stmt = (
+        insert(User)
+        .values(
+            email=user.email,
+            username=user.username,
+            first_name=user.first_name,
+            last_name=user.last_name,
+            phone_number=user.phone_number,
+            hashed_password=get_password_hash(user.password),
+            is_barber=user.is_barber,
+        )
+        .returning(User)
     )
-    db.add(db_user)
+    db_user = db.execute(stmt).scalar_one()
     db.commit()
-    db.refresh(db_user)
+    clear_user_cache()
     return db_user
 
 
-def update_user(db: Session, user_id: int, user: UserUpdate) -> Optional[User]:
-    """Update an existing user."""
-    db_user = get_user(db, user_id)
-    if db_user is None:
-        return None
-
+def update_user(db: Session, db_user: User, user: UserUpdate) -> Optional[User]:
+    """Update an existing, already loaded user."""
     # Convert Pydantic model to dict, excluding unset fields
-    update_data = user.dict(exclude_unset=True)
+    update_data = user.model_dump(exclude_unset=True)
 
     # Hash password if it's provided
-    if "password" in update_data and update_data["password"]:
-        update_data["hashed_password"] = get_password_hash(update_data.pop("password"))
-
-    # Update user attributes
-    for field, value in update_data.items():
-        if hasattr(db_user, field):
-            setattr(db_user, field, value)
+    password = update_data.pop("password", None)
+    if password:
+        update_data["hashed_password"] = get_password_hash(password)
+
+    if not update_data:
+        return db_user
+
+    # Update and reload the row in a single UPDATE ... RETURNING
+    stmt = (
+        update(User)
+        .where(User.id == db_user.id)
+        .values(**update_data)
+        .returning(User)
+    )
+    db_user = db.execute(stmt).scalar_one_or_none()
+    if db_user is None:
+        return None
 
     db.commit()
-    db.refresh(db_user)
+    clear_user_cache()
     return db_user
 
 
+def update_password_hash(db: Session, user_id: int, hashed_password: str) -> None:
+    """Replace the stored password hash of a user."""
+    stmt = (
+        update(User).where(User.id == user_id).values(hashed_password=hashed_password)
+    )
+    db.execute(stmt)
+    db.commit()
+    clear_user_cache()
+
+
 def delete_user(db: Session, user_id: int) -> bool:
     """Delete a user."""
-    db_user = get_user(db, user_id)
-    if db_user is None:
+    stmt = delete(User).where(User.id == user_id).returning(User.id)
+    deleted_id = db.execute(stmt).scalar_one_or_none()
+    if deleted_id is None:
         return False
 
-    db.delete(db_user)
     db.commit()
+    clear_user_cache()
     return True
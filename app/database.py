@@ -1,17 +1,70 @@
-from sqlalchemy import create_engine
+import os
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
 # SQLite database URL
-SQLALCHEMY_DATABASE_URL = "sqlite:///./sqlite_data/users.db"
+SQLALCHEMY_DATABASE_URL = os.environ.get(
+    "DATABASE_URL", "sqlite:///./sqlite_data/users.db"
+)
+
+# Connection pool sizing
+POOL_SIZE = 20
+MAX_OVERFLOW = 40
+POOL_RECYCLE_SECONDS = 3600
+
+
+def _is_sqlite_memory_url(url: str) -> bool:
+    """Check whether a SQLite URL names an in-memory database."""
+    url = make_url(url)
+    return url.database in (None, "", ":memory:") or url.query.get("mode") == "memory"
+
+
+# Pool sizing only applies to file databases, in-memory SQLite gets a
+# SingletonThreadPool that doesn't accept it
+if _is_sqlite_memory_url(SQLALCHEMY_DATABASE_URL):
+    _pool_options = {}
+else:
+    _pool_options = {
+        "pool_size": POOL_SIZE,
+        "max_overflow": MAX_OVERFLOW,
+        "pool_recycle": POOL_RECYCLE_SECONDS,
+    }
 
 # Create engine with SQLite-specific configuration
 engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
+    SQLALCHEMY_DATABASE_URL,
+    connect_args={"check_same_thread": False},
+    pool_pre_ping=True,
+    **_pool_options,
 )
 
-# Create session factory
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# SQLite pragmas applied to every new connection
+SQLITE_PRAGMAS = (
+    "journal_mode=WAL",
+    "synchronous=NORMAL",
+    "temp_store=MEMORY",
+    "mmap_size=268435456",
+    "cache_size=-20000",
+    "foreign_keys=ON",
+)
+
+
+@event.listens_for(engine, "connect")
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    for pragma in SQLITE_PRAGMAS:
+        cursor.execute(f"PRAGMA {pragma}")
+    cursor.close()
+
+
+# Create session factory. Sessions live for a single request, so objects are
+# not expired on commit and rows returned by UPDATE ... RETURNING stay loaded.
+SessionLocal = sessionmaker(
+    autocommit=False, autoflush=False, expire_on_commit=False, bind=engine
+)
 
 # Declarative base for models
 Base = declarative_base()
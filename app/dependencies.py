@@ -1,15 +1,36 @@
+import time
+from dataclasses import dataclass
+from threading import Lock
+from typing import Annotated
+
+import jwt
+from cachetools import TTLCache
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from jose import JWTError, jwt
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 
 from app.database import SessionLocal
 from app.models.user import User
-from app.utils.auth import ALGORITHM, SECRET_KEY
+from app.utils.auth import ALGORITHM, SIGNING_KEY
 
 # OAuth2 scheme for token authentication
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
 
+# Verified token payloads keyed by the raw token, so repeat requests skip the
+# JWT decode. Entries also carry the token's own expiry, which is re-checked
+# on every hit. Failed decodes are never cached.
+_token_cache = TTLCache(maxsize=4096, ttl=5)
+_token_cache_lock = Lock()
+
+
+# Identity of the caller as carried by the token claims
+@dataclass(frozen=True)
+class AuthedUser:
+    id: int
+    is_barber: bool
+    is_active: bool
+
 
 # Database session dependency
 def get_db():
@@ -20,31 +41,60 @@ def get_db():
         db.close()
 
 
-# Current user dependency
-def get_current_user(
-    token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)
-) -> User:
-    credentials_exception = HTTPException(
+DBDep = Annotated[Session, Depends(get_db)]
+TokenDep = Annotated[str, Depends(oauth2_scheme)]
+
+
+# Decode a JWT, reusing a recently verified payload when possible
+def _decode_token(token: str) -> dict:
+    with _token_cache_lock:
+        cached = _token_cache.get(token)
+
+    if cached is not None:
+        payload, exp = cached
+        if time.time() < exp:
+            return payload
+        with _token_cache_lock:
+            _token_cache.pop(token, None)
+
+    payload = jwt.decode(
+        token,
+        SIGNING_KEY,
+        algorithms=[ALGORITHM],
+        options={
+            "require": ["exp", "sub"],
+            "verify_aud": False,
+            "verify_iat": False,
+        },
+    )
+
+    with _token_cache_lock:
+        _token_cache[token] = (payload, payload["exp"])
+    return payload
+
+
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
 
-    try:
-        # Decode JWT
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id: str = payload.get("sub")
 
-        if user_id is None:
-            raise credentials_exception
-    except JWTError:
-        raise credentials_exception
+# Current user dependency
+def get_current_user(token: TokenDep, db: DBDep) -> User:
+    try:
+        # Decode JWT, the required "sub" claim holds the user ID
+        payload = _decode_token(token)
+        user_id: str = payload["sub"]
+    except jwt.PyJWTError:
+        raise _credentials_exception()
 
     # Get user from database
-    user = db.query(User).filter(User.id == user_id).first()
+    user = db.execute(select(User).where(User.id == user_id)).scalar_one_or_none()
 
     if user is None:
-        raise credentials_exception
+        raise _credentials_exception()
 
     if not user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
@@ -52,11 +102,38 @@ def get_current_user(
     return user
 
 
+UserDep = Annotated[User, Depends(get_current_user)]
+
+
+# Current user identity from the token claims alone, without a database lookup
+def get_current_user_claims(token: TokenDep) -> AuthedUser:
+    try:
+        payload = _decode_token(token)
+        user = AuthedUser(
+            id=int(payload["sub"]),
+            is_barber=bool(payload.get("is_barber", False)),
+            is_active=bool(payload.get("is_active", True)),
+        )
+    except (jwt.PyJWTError, ValueError):
+        raise _credentials_exception()
+
+    if not user.is_active:
+        raise HTTPException(status_code=400, detail="Inactive user")
+
+    return user
+
+
+ClaimsDep = Annotated[AuthedUser, Depends(get_current_user_claims)]
+
+
 # Dependency to check if user is barber
-def get_barber_user(current_user: User = Depends(get_current_user)) -> User:
+def get_barber_user(current_user: ClaimsDep) -> AuthedUser:
     if not current_user.is_barber:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not enough permissions",
         )
     return current_user
+
+
+BarberDep = Annotated[AuthedUser, Depends(get_barber_user)]
@@ -1,5 +1,8 @@
+import os
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 
 from app.database import create_all_tables
 from app.routers import auth_router, users_router
@@ -13,12 +16,20 @@ app = FastAPI(
     title="Barbershop User Service",
     description="User management microservice for the barbershop appointment system",
     version="0.1.0",
+    default_response_class=ORJSONResponse,
 )
 
+# Allowed CORS origins, comma-separated in the CORS_ORIGINS env variable
+CORS_ORIGINS = [
+    origin.strip()
+    for origin in os.environ.get("CORS_ORIGINS", "").split(",")
+    if origin.strip()
+]
+
 # Add CORS middleware
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],  # In production, set this to specific origins
+    allow_origins=CORS_ORIGINS,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
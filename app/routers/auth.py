@@ -1,16 +1,24 @@
 from datetime import timedelta
+from typing import Annotated
 
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
+
 from sqlalchemy.orm import Session
 
-from app.crud.user import get_user_by_email
-from app.dependencies import get_db
+from app.crud.user import (
+    UserCredentials,
+    get_user_credentials_by_email,
+    update_password_hash,
+)
+from app.dependencies import DBDep
 from app.schemas.auth import LoginRequest, Token
 from app.utils.auth import (
     ACCESS_TOKEN_EXPIRE_MINUTES,
     create_access_token,
-    verify_password,
+    get_password_hash,
+    password_needs_rehash,
+    verify_password_constant_time,
 )
 from app.utils.logging import get_logger
 
@@ -19,52 +27,74 @@ logger = get_logger(__name__)
 router = APIRouter(tags=["authentication"])
 
 
+def _rehash_if_needed(db: Session, user: UserCredentials, password: str) -> None:
+    """Upgrade a hash made at another bcrypt cost after a successful login.
+
+    Keeps every stored hash as slow as the dummy hash used for unknown emails,
+    so response times don't reveal which emails are registered.
+    """
+    if password_needs_rehash(user.hashed_password):
+        update_password_hash(db, user.id, get_password_hash(password))
+
+
 @router.post("/login", response_model=Token)
 def login_for_access_token(
-    form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)
+    form_data: Annotated[OAuth2PasswordRequestForm, Depends()], db: DBDep
 ):
     """
     OAuth2 compatible token login, get an access token for future requests
     """
-    logger.info(f"Login attempt for: {form_data.username}")
+    logger.info("Login attempt for: %s", form_data.username)
 
-    user = get_user_by_email(db, email=form_data.username)
-    if not user or not verify_password(form_data.password, user.hashed_password):
-        logger.warning(f"Failed login attempt for: {form_data.username}")
+    user = get_user_credentials_by_email(db, email=form_data.username)
+    hashed_password = user.hashed_password if user else None
+    if not verify_password_constant_time(form_data.password, hashed_password):
+        logger.warning("Failed login attempt for: %s", form_data.username)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
 
+    _rehash_if_needed(db, user, form_data.password)
+
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        subject=user.id, is_barber=user.is_barber, expires_delta=access_token_expires
+        subject=user.id,
+        is_barber=user.is_barber,
+        is_active=user.is_active,
+        expires_delta=access_token_expires,
     )
 
-    logger.info(f"Successful login for user ID: {user.id}")
+    logger.info("Successful login for user ID: %s", user.id)
     return {"access_token": access_token, "token_type": "bearer"}
 
 
 @router.post("/login/email", response_model=Token)
-def login_with_email(login_data: LoginRequest, db: Session = Depends(get_db)):
+def login_with_email(login_data: LoginRequest, db: DBDep):
     """
     Login with email and password
     """
-    logger.info(f"Email login attempt for: {login_data.email}")
+    logger.info("Email login attempt for: %s", login_data.email)
 
-    user = get_user_by_email(db, email=login_data.email)
-    if not user or not verify_password(login_data.password, user.hashed_password):
-        logger.warning(f"Failed email login attempt for: {login_data.email}")
+    user = get_user_credentials_by_email(db, email=login_data.email)
+    hashed_password = user.hashed_password if user else None
+    if not verify_password_constant_time(login_data.password, hashed_password):
+        logger.warning("Failed email login attempt for: %s", login_data.email)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
         )
 
+    _rehash_if_needed(db, user, login_data.password)
+
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        subject=user.id, is_barber=user.is_barber, expires_delta=access_token_expires
+        subject=user.id,
+        is_barber=user.is_barber,
+        is_active=user.is_active,
+        expires_delta=access_token_expires,
     )
 
-    logger.info(f"Successful email login for user ID: {user.id}")
+    logger.info("Successful email login for user ID: %s", user.id)
     return {"access_token": access_token, "token_type": "bearer"}
@@ -1,4 +1,17 @@
-from app.utils.auth import create_access_token, get_password_hash, verify_password
+from app.utils.auth import (
+    create_access_token,
+    get_password_hash,
+    password_needs_rehash,
+    verify_password,
+    verify_password_constant_time,
+)
 from app.utils.logging import get_logger
 
-__all__ = ["get_logger", "verify_password", "get_password_hash", "create_access_token"]
+__all__ = [
+    "get_logger",
+    "verify_password",
+    "verify_password_constant_time",
+    "get_password_hash",
+    "password_needs_rehash",
+    "create_access_token",
+]
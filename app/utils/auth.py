@@ -2,39 +2,65 @@ import os
 from datetime import datetime, timedelta
 from typing import Any, Optional, Union
 
-from jose import jwt
-from passlib.context import CryptContext
+import jwt
+from passlib.hash import bcrypt
 
 # JWT settings - use environment variables in production
 SECRET_KEY = os.environ.get("SECRET_KEY", "secret_key_123")
+SIGNING_KEY = SECRET_KEY.encode("utf-8")  # HMAC key bytes, encoded once
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Password hashing - bcrypt handler bound once, cost tunable via BCRYPT_ROUNDS
+BCRYPT_ROUNDS = int(os.environ.get("BCRYPT_ROUNDS", "10"))
+_bcrypt = bcrypt.using(rounds=BCRYPT_ROUNDS)
+
+# Hash checked against when no user matches, so failed lookups take one bcrypt
+# verify like a wrong password. It only costs the same time as hashes made at
+# BCRYPT_ROUNDS, older hashes are rehashed on login (see password_needs_rehash).
+_DUMMY_HASH = _bcrypt.hash("unused")
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against a hash."""
-    return pwd_context.verify(plain_password, hashed_password)
+    return _bcrypt.verify(plain_password, hashed_password)
+
+
+def verify_password_constant_time(
+    plain_password: str, hashed_password: Optional[str]
+) -> bool:
+    """Verify a password, spending the same bcrypt time when there is no hash."""
+    valid = _bcrypt.verify(plain_password, hashed_password or _DUMMY_HASH)
+    return valid and hashed_password is not None
+
+
+def password_needs_rehash(hashed_password: str) -> bool:
+    """Check whether a hash was made with a cost other than BCRYPT_ROUNDS."""
+    return _bcrypt.needs_update(hashed_password)
 
 
 def get_password_hash(password: str) -> str:
     """Generate password hash."""
-    return pwd_context.hash(password)
+    return _bcrypt.hash(password)
 
 
 def create_access_token(
     subject: Union[str, Any],
     is_barber: bool = False,
     expires_delta: Optional[timedelta] = None,
+    is_active: bool = True,
 ) -> str:
-    """Create a JWT access token with is_barber flag."""
+    """Create a JWT access token with is_barber and is_active flags."""
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
     else:
         expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
 
-    to_encode = {"exp": expire, "sub": str(subject), "is_barber": is_barber}
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    to_encode = {
+        "exp": expire,
+        "sub": str(subject),
+        "is_barber": bool(is_barber),
+        "is_active": bool(is_active),
+    }
+    encoded_jwt = jwt.encode(to_encode, SIGNING_KEY, algorithm=ALGORITHM)
     return encoded_jwt
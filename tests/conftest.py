@@ -0,0 +1,139 @@
+import os
+import tempfile
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.dialects import sqlite
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from sqlalchemy.schema import CreateIndex, CreateTable
+
+# The app's own engine is only touched by the startup event, keep it out of the
+# working tree
+APP_DATA_DIR = tempfile.TemporaryDirectory()
+os.environ["DATABASE_URL"] = f"sqlite:///{APP_DATA_DIR.name}/users.db"
+
+from app.crud import clear_user_cache
+from app.database import Base
+from app.dependencies import get_db
+from app.main import app
+
+# test DB, in memory and shared through a single pooled connection
+SQLALCHEMY_TEST_DATABASE_URL = "sqlite://"
+
+# Throwaway data, no need for durability
+TEST_SQLITE_PRAGMAS = (
+    "PRAGMA synchronous=OFF",
+    "PRAGMA journal_mode=MEMORY",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA locking_mode=EXCLUSIVE",
+)
+
+# Schema DDL rendered once, in dependency order, tables before their indexes
+DDL_STATEMENTS = [
+    str(ddl.compile(dialect=sqlite.dialect())).strip()
+    for table in Base.metadata.sorted_tables
+    for ddl in (
+        CreateTable(table),
+        *(CreateIndex(index) for index in sorted(table.indexes, key=lambda i: i.name)),
+    )
+]
+
+# Sessions join the current test transaction, their commits only release
+# SAVEPOINTs. Like SessionLocal, objects are not expired on commit, so rows
+# returned by RETURNING are served as loaded.
+TestingSessionLocal = sessionmaker(
+    autocommit=False,
+    autoflush=False,
+    expire_on_commit=False,
+    join_transaction_mode="create_savepoint",
+)
+
+
+# Let SQLAlchemy emit BEGIN itself so pysqlite supports SAVEPOINTs
+def _configure_test_connection(dbapi_connection, connection_record):
+    dbapi_connection.isolation_level = None
+    cursor = dbapi_connection.cursor()
+    for pragma in TEST_SQLITE_PRAGMAS:
+        cursor.execute(pragma)
+    cursor.close()
+
+
+def _emit_begin(connection):
+    connection.exec_driver_sql("BEGIN")
+
+
+@pytest.fixture(scope="session")
+def engine():
+    """In-memory test engine, created once per test session"""
+    engine = create_engine(
+        SQLALCHEMY_TEST_DATABASE_URL,
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    event.listen(engine, "connect", _configure_test_connection)
+    event.listen(engine, "begin", _emit_begin)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture(scope="session")
+def tables(engine):
+    """Create the schema once, every test rolls its changes back"""
+    with engine.begin() as connection:
+        for statement in DDL_STATEMENTS:
+            connection.exec_driver_sql(statement)
+
+
+@pytest.fixture(scope="session")
+def connection(engine, tables):
+    """The single connection all test sessions are bound to"""
+    with engine.connect() as connection:
+        yield connection
+
+
+@pytest.fixture(scope="session")
+def session_factory():
+    """Factory for sessions joining the test transactions"""
+    return TestingSessionLocal
+
+
+@pytest.fixture
+def db_session(connection):
+    """Session inside a transaction that is rolled back after the test"""
+    # Nest inside the seeding transaction of the test class, when there is one
+    if connection.in_transaction():
+        transaction = connection.begin_nested()
+    else:
+        transaction = connection.begin()
+
+    # Drop user lookups cached by earlier tests
+    clear_user_cache()
+
+    session = TestingSessionLocal(bind=connection)
+    yield session
+    session.close()
+
+    # Undo everything the test wrote
+    transaction.rollback()
+
+
+@pytest.fixture(scope="session")
+def app_client():
+    """Client entered once so startup/shutdown run once"""
+    with TestClient(app) as client:
+        yield client
+    APP_DATA_DIR.cleanup()
+
+
+@pytest.fixture
+def client(app_client, db_session):
+    """Client whose requests use the test session"""
+
+    def override_get_db():
+        yield db_session
+
+    app.dependency_overrides[get_db] = override_get_db
+    yield app_client
+    app.dependency_overrides.clear()
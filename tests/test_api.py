@@ -1,24 +1,17 @@
-import os
-import sys
-import unittest
-
-from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-
-from app.database import Base
-from app.dependencies import get_db
-from app.main import app
-
-# test DB
-os.makedirs("./test_data", exist_ok=True)
-SQLALCHEMY_TEST_DATABASE_URL = "sqlite:///./test_data/test.db"
-engine = create_engine(
-    SQLALCHEMY_TEST_DATABASE_URL, connect_args={"check_same_thread": False}
+from dataclasses import dataclass
+
+import orjson
+import pytest
+from passlib.hash import bcrypt
+from sqlalchemy import select
+
+from app.models.user import User
+from app.utils.auth import (
+    BCRYPT_ROUNDS,
+    create_access_token,
+    get_password_hash,
+    password_needs_rehash,
 )
-TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 # Test data
 test_user = {
@@ -42,206 +35,249 @@ test_barber = {
 }
 
 
-class BaseTestCase(unittest.TestCase):
-    """Base test case with setup and teardown"""
+def login_payload(user_data):
+    """Encode the email login request body for a test user"""
+    return orjson.dumps(
+        {"email": user_data["email"], "password": user_data["password"]}
+    )
+
 
-    def setUp(self):
-        """Set up test database and client before each test"""
-        # Create tables
-        Base.metadata.create_all(bind=engine)
+def json_body(response):
+    """Decode a response body with orjson"""
+    return orjson.loads(response.content)
 
-        # Override the get_db dependency
-        def override_get_db():
-            try:
-                db = TestingSessionLocal()
-                yield db
-            finally:
-                db.close()
 
-        app.dependency_overrides[get_db] = override_get_db
+# Password hashes for the seeded users, computed once
+PASSWORD_HASHES = {
+    user_data["email"]: get_password_hash(user_data["password"])
+    for user_data in (test_user, test_barber)
+}
 
-        # Create test client
-        self.client = TestClient(app)
 
-        # Set up user tokens
-        self.user_token = None
-        self.barber_token = None
+def user_row(user_data):
+    """Build a User row for a test user with its precomputed password hash"""
+    fields = {key: value for key, value in user_data.items() if key != "password"}
+    return User(**fields, hashed_password=PASSWORD_HASHES[user_data["email"]])
 
-    def tearDown(self):
-        """Clean up after each test"""
-        # Drop all tables
-        Base.metadata.drop_all(bind=engine)
 
-        engine.dispose()
+# Request bodies sent by many tests, encoded once
+JSON_HEADERS = {"Content-Type": "application/json"}
+TEST_USER_BYTES = orjson.dumps(test_user)
+TEST_USER_LOGIN_BYTES = login_payload(test_user)
+TEST_BARBER_LOGIN_BYTES = login_payload(test_barber)
 
-        # Remove the test database file
-        if os.path.exists("./test.db"):
-            os.remove("./test.db")
 
-        # Clear dependency overrides
-        app.dependency_overrides = {}
+def seed_users(db, *users):
+    """Insert test users directly, all in a single transaction"""
+    rows = [user_row(user_data) for user_data in users]
+    db.add_all(rows)
+    db.commit()
+    return rows
 
-    def create_user_and_get_token(self, user_data):
-        """Helper method to create a user and get an authentication token"""
-        # Create the user
-        response = self.client.post("/api/users/", json=user_data)
-        self.assertEqual(response.status_code, 201)
 
-        # Login and get token
-        login_data = {"email": user_data["email"], "password": user_data["password"]}
-        response = self.client.post("/api/auth/login/email", json=login_data)
-        self.assertEqual(response.status_code, 200)
+def auth_header(user):
+    """Mint a token for a user without logging in"""
+    token = create_access_token(subject=user.id, is_barber=user.is_barber)
+    return {"Authorization": f"Bearer {token}"}
 
-        token = response.json()["access_token"]
-        return {"Authorization": f"Bearer {token}"}
 
+@dataclass(frozen=True)
+class SeededUsers:
+    """IDs and auth headers of the users seeded for a test class"""
 
-class HealthCheckTestCase(BaseTestCase):
+    user_id: int
+    barber_id: int
+    user_auth: dict
+    barber_auth: dict
+
+
+@pytest.fixture(scope="class")
+def seeded_users(connection, session_factory):
+    """Create test_user and test_barber and their tokens once per class"""
+    # Every test of the class runs nested in this transaction, rolled back at the
+    # end of the class
+    transaction = connection.begin()
+    with session_factory(bind=connection) as db:
+        user, barber = seed_users(db, test_user, test_barber)
+    yield SeededUsers(
+        user_id=user.id,
+        barber_id=barber.id,
+        user_auth=auth_header(user),
+        barber_auth=auth_header(barber),
+    )
+    transaction.rollback()
+
+
+class TestHealthCheck:
     """Tests for the health check endpoint"""
 
-    def test_health_check(self):
+    def test_health_check(self, client):
         """Test that health check endpoint returns success"""
-        response = self.client.get("/")
-        self.assertEqual(response.status_code, 200)
-        self.assertEqual(response.json()["status"], "healthy")
-        self.assertIn("barbershop-user-service", response.json()["service"])
+        response = client.get("/")
+        assert response.status_code == 200
 
+        data = json_body(response)
+        assert data["status"] == "healthy"
+        assert "barbershop-user-service" in data["service"]
 
-class UserTestCase(BaseTestCase):
-    """Tests for user-related endpoints"""
 
-    def test_create_user(self):
+class TestUserRegistration:
+    """Tests for user creation"""
+
+    def test_create_user(self, client):
         """Test creating a new user"""
-        response = self.client.post("/api/users/", json=test_user)
-        self.assertEqual(response.status_code, 201)
+        response = client.post(
+            "/api/users/", content=TEST_USER_BYTES, headers=JSON_HEADERS
+        )
+        assert response.status_code == 201
 
-        data = response.json()
-        self.assertEqual(data["email"], test_user["email"])
-        self.assertEqual(data["username"], test_user["username"])
-        self.assertNotIn("password", data)
-        self.assertEqual(data["is_barber"], test_user["is_barber"])
+        data = json_body(response)
+        assert data["email"] == test_user["email"]
+        assert data["username"] == test_user["username"]
+        assert "password" not in data
+        assert data["is_barber"] == test_user["is_barber"]
 
-    def test_create_duplicate_user(self):
+    def test_create_duplicate_user(self, client, db_session):
         """Test that creating a duplicate user fails"""
-        # Create first user
-        response = self.client.post("/api/users/", json=test_user)
-        self.assertEqual(response.status_code, 201)
+        # Seed the first user
+        seed_users(db_session, test_user)
 
         # Try to create another user with the same email
         duplicate_user = test_user.copy()
         duplicate_user["username"] = "different"
-        response = self.client.post("/api/users/", json=duplicate_user)
-        self.assertEqual(response.status_code, 400)
-        self.assertIn("already registered", response.json()["detail"].lower())
+        response = client.post("/api/users/", json=duplicate_user)
+        assert response.status_code == 400
+        assert "already registered" in json_body(response)["detail"].lower()
+
+    def test_create_duplicate_username(self, client, db_session):
+        """Test that creating a user with a taken username fails"""
+        # Seed the first user
+        seed_users(db_session, test_user)
+
+        # Try to create another user with the same username
+        duplicate_user = test_user.copy()
+        duplicate_user["email"] = "different@example.com"
+        response = client.post("/api/users/", json=duplicate_user)
+        assert response.status_code == 400
+        assert "already taken" in json_body(response)["detail"].lower()
+
 
-    def test_get_users_unauthorized(self):
+@pytest.mark.usefixtures("seeded_users")
+class TestUsers:
+    """Tests for user-related endpoints"""
+
+    def test_get_users_unauthorized(self, client):
         """Test that unauthorized users can't access user list"""
-        response = self.client.get("/api/users/")
-        self.assertEqual(response.status_code, 401)
+        response = client.get("/api/users/")
+        assert response.status_code == 401
+
+    def test_get_users_invalid_token(self, client):
+        """Test that a malformed token is rejected"""
+        headers = {"Authorization": "Bearer not-a-valid-token"}
+        response = client.get("/api/users/", headers=headers)
+        assert response.status_code == 401
 
-    def test_get_users(self):
+    def test_get_users(self, client, seeded_users):
         """Test retrieving the list of users"""
-        # Create a user and get token
-        token = self.create_user_and_get_token(test_user)
+        token = seeded_users.user_auth
 
         # Get users list
-        response = self.client.get("/api/users/", headers=token)
-        self.assertEqual(response.status_code, 200)
+        response = client.get("/api/users/", headers=token)
+        assert response.status_code == 200
 
-        data = response.json()
-        self.assertIsInstance(data, list)
-        self.assertGreater(len(data), 0)
-        self.assertEqual(data[0]["email"], test_user["email"])
+        data = json_body(response)
+        assert isinstance(data, list)
+        assert len(data) > 0
+        assert data[0]["email"] == test_user["email"]
 
-    def test_get_current_user(self):
+    def test_get_current_user(self, client, seeded_users):
         """Test getting the current user info"""
-        # Create a user and get token
-        token = self.create_user_and_get_token(test_user)
+        token = seeded_users.user_auth
 
         # Get current user
-        response = self.client.get("/api/users/me", headers=token)
-        self.assertEqual(response.status_code, 200)
+        response = client.get("/api/users/me", headers=token)
+        assert response.status_code == 200
 
-        data = response.json()
-        self.assertEqual(data["email"], test_user["email"])
-        self.assertEqual(data["username"], test_user["username"])
+        data = json_body(response)
+        assert data["email"] == test_user["email"]
+        assert data["username"] == test_user["username"]
 
-    def test_update_user(self):
+    def test_update_user(self, client, seeded_users):
         """Test updating a user"""
-        # Create a user and get token
-        token = self.create_user_and_get_token(test_user)
-
-        # Get user ID
-        response = self.client.get("/api/users/me", headers=token)
-        user_id = response.json()["id"]
+        token = seeded_users.user_auth
 
         # Update user
         update_data = {"first_name": "UpdatedFirst", "last_name": "UpdatedLast"}
-        response = self.client.put(
-            f"/api/users/{user_id}", json=update_data, headers=token
+        response = client.put(
+            f"/api/users/{seeded_users.user_id}", json=update_data, headers=token
+        )
+        assert response.status_code == 200
+
+        data = json_body(response)
+        assert data["first_name"] == update_data["first_name"]
+        assert data["last_name"] == update_data["last_name"]
+        # Unchanged fields remain the same
+        assert data["email"] == test_user["email"]
+
+    def test_update_user_password(self, client, seeded_users):
+        """Test that an updated password can be used to log in"""
+        token = seeded_users.user_auth
+
+        # Change password
+        update_data = {"password": "newpassword123"}
+        response = client.put(
+            f"/api/users/{seeded_users.user_id}", json=update_data, headers=token
         )
-        self.assertEqual(response.status_code, 200)
+        assert response.status_code == 200
+        assert json_body(response)["updated_at"] is not None
 
-        data = response.json()
-        self.assertEqual(data["first_name"], update_data["first_name"])
-        self.assertEqual(data["last_name"], update_data["last_name"])
-        self.assertEqual(
-            data["email"], test_user["email"]
-        )  # Unchanged fields remain the same
+        # Old password no longer works, new one does
+        response = client.post(
+            "/api/auth/login/email", content=TEST_USER_LOGIN_BYTES, headers=JSON_HEADERS
+        )
+        assert response.status_code == 401
 
-    def test_user_cant_update_other_user(self):
-        """Test that a regular user can't update another user"""
-        # Create user and barber with tokens
-        user_token = self.create_user_and_get_token(test_user)
-        barber_token = self.create_user_and_get_token(test_barber)
+        login_data = {"email": test_user["email"], "password": update_data["password"]}
+        response = client.post("/api/auth/login/email", json=login_data)
+        assert response.status_code == 200
 
-        # Get barber's ID
-        response = self.client.get("/api/users/me", headers=barber_token)
-        barber_id = response.json()["id"]
+    def test_user_cant_update_other_user(self, client, seeded_users):
+        """Test that a regular user can't update another user"""
+        user_token = seeded_users.user_auth
 
         # Try to update barber as regular user
         update_data = {"first_name": "Hacked"}
-        response = self.client.put(
-            f"/api/users/{barber_id}", json=update_data, headers=user_token
+        response = client.put(
+            f"/api/users/{seeded_users.barber_id}", json=update_data, headers=user_token
         )
-        self.assertEqual(response.status_code, 403)
+        assert response.status_code == 403
 
-    def test_barber_can_update_user(self):
+    def test_barber_can_update_user(self, client, seeded_users):
         """Test that a barber can update another user"""
-        # Create user and barber with tokens
-        user_token = self.create_user_and_get_token(test_user)
-        barber_token = self.create_user_and_get_token(test_barber)
-
-        # Get user's ID
-        response = self.client.get("/api/users/me", headers=user_token)
-        user_id = response.json()["id"]
+        barber_token = seeded_users.barber_auth
 
         # Update user as barber
         update_data = {"first_name": "UpdatedByBarber"}
-        response = self.client.put(
-            f"/api/users/{user_id}", json=update_data, headers=barber_token
+        response = client.put(
+            f"/api/users/{seeded_users.user_id}", json=update_data, headers=barber_token
         )
-        self.assertEqual(response.status_code, 200)
-        self.assertEqual(response.json()["first_name"], update_data["first_name"])
+        assert response.status_code == 200
+        assert json_body(response)["first_name"] == update_data["first_name"]
 
-    def test_get_barbers(self):
+    def test_get_barbers(self, client):
         """Test getting all barbers"""
-        # Create both a user and a barber
-        self.client.post("/api/users/", json=test_user)
-        self.client.post("/api/users/", json=test_barber)
-
         # Get all barbers
-        response = self.client.get("/api/users/barbers/")
-        self.assertEqual(response.status_code, 200)
+        response = client.get("/api/users/barbers/")
+        assert response.status_code == 200
 
-        data = response.json()
-        self.assertIsInstance(data, list)
+        data = json_body(response)
+        assert isinstance(data, list)
 
         # Should only contain barbers
         barbers = [u for u in data if u["is_barber"]]
         non_barbers = [u for u in data if not u["is_barber"]]
-        self.assertGreater(len(barbers), 0)
-        self.assertEqual(len(non_barbers), 0)
+        assert len(barbers) > 0
+        assert len(non_barbers) == 0
 
         # Verify barber data
         found_test_barber = False
@@ -250,84 +286,121 @@ class UserTestCase(BaseTestCase):
                 found_test_barber = True
                 break
 
-        self.assertTrue(found_test_barber)
+        assert found_test_barber
 
-    def test_delete_user_unauthorized(self):
+    def test_delete_user_unauthorized(self, client, seeded_users):
         """Test that a regular user can't delete users"""
-        # Create a user and get token
-        token = self.create_user_and_get_token(test_user)
-
-        # Get user ID
-        response = self.client.get("/api/users/me", headers=token)
-        user_id = response.json()["id"]
+        token = seeded_users.user_auth
 
         # Try to delete self as regular user
-        response = self.client.delete(f"/api/users/{user_id}", headers=token)
-        self.assertEqual(response.status_code, 403)
+        response = client.delete(f"/api/users/{seeded_users.user_id}", headers=token)
+        assert response.status_code == 403
 
-    def test_barber_can_delete_user(self):
+    def test_barber_can_delete_user(self, client, seeded_users):
         """Test that a barber can delete users"""
-        # Create user and barber with tokens
-        user_token = self.create_user_and_get_token(test_user)
-        barber_token = self.create_user_and_get_token(test_barber)
-
-        # Get user's ID
-        response = self.client.get("/api/users/me", headers=user_token)
-        user_id = response.json()["id"]
+        barber_token = seeded_users.barber_auth
 
         # Delete user as barber
-        response = self.client.delete(f"/api/users/{user_id}", headers=barber_token)
-        self.assertEqual(response.status_code, 204)
+        response = client.delete(
+            f"/api/users/{seeded_users.user_id}", headers=barber_token
+        )
+        assert response.status_code == 204
 
         # Verify user is deleted
-        response = self.client.get(f"/api/users/{user_id}", headers=barber_token)
-        self.assertEqual(response.status_code, 404)
+        response = client.get(
+            f"/api/users/{seeded_users.user_id}", headers=barber_token
+        )
+        assert response.status_code == 404
+
+    def test_inactive_barber_cant_delete_user(self, client, seeded_users):
+        """Test that a token issued to an inactive barber can't delete users"""
+        barber_token = seeded_users.barber_auth
+
+        # Deactivate the barber and log in again
+        response = client.put(
+            f"/api/users/{seeded_users.barber_id}",
+            json={"is_active": False},
+            headers=barber_token,
+        )
+        assert response.status_code == 200
+
+        response = client.post(
+            "/api/auth/login/email",
+            content=TEST_BARBER_LOGIN_BYTES,
+            headers=JSON_HEADERS,
+        )
+        token = json_body(response)["access_token"]
+
+        # Try to delete user with the inactive barber's token
+        response = client.delete(
+            f"/api/users/{seeded_users.user_id}",
+            headers={"Authorization": f"Bearer {token}"},
+        )
+        assert response.status_code == 400
 
 
-class AuthTestCase(BaseTestCase):
+@pytest.mark.usefixtures("seeded_users")
+class TestAuth:
     """Tests for authentication endpoints"""
 
-    def test_login_with_email(self):
+    def test_login_with_email(self, client):
         """Test login with email endpoint"""
-        # Create a user first
-        self.client.post("/api/users/", json=test_user)
-
         # Try to login
-        login_data = {"email": test_user["email"], "password": test_user["password"]}
-        response = self.client.post("/api/auth/login/email", json=login_data)
-        self.assertEqual(response.status_code, 200)
+        response = client.post(
+            "/api/auth/login/email", content=TEST_USER_LOGIN_BYTES, headers=JSON_HEADERS
+        )
+        assert response.status_code == 200
 
-        data = response.json()
-        self.assertIn("access_token", data)
-        self.assertEqual(data["token_type"], "bearer")
+        data = json_body(response)
+        assert "access_token" in data
+        assert data["token_type"] == "bearer"
 
-    def test_login_oauth(self):
+    def test_login_oauth(self, client):
         """Test login with OAuth2 password flow"""
-        # Create a user first
-        self.client.post("/api/users/", json=test_user)
-
         # Try to login with OAuth2 password flow
-        response = self.client.post(
+        response = client.post(
             "/api/auth/login",
             data={"username": test_user["email"], "password": test_user["password"]},
             headers={"Content-Type": "application/x-www-form-urlencoded"},
         )
-        self.assertEqual(response.status_code, 200)
+        assert response.status_code == 200
 
-        data = response.json()
-        self.assertIn("access_token", data)
-        self.assertEqual(data["token_type"], "bearer")
+        data = json_body(response)
+        assert "access_token" in data
+        assert data["token_type"] == "bearer"
 
-    def test_login_invalid_credentials(self):
+    def test_login_invalid_credentials(self, client):
         """Test login with invalid credentials"""
-        # Create a user first
-        self.client.post("/api/users/", json=test_user)
-
         # Try to login with wrong password
         login_data = {"email": test_user["email"], "password": "wrongpassword"}
-        response = self.client.post("/api/auth/login/email", json=login_data)
-        self.assertEqual(response.status_code, 401)
+        response = client.post("/api/auth/login/email", json=login_data)
+        assert response.status_code == 401
+
+    def test_login_unknown_email(self, client):
+        """Test login with an email that is not registered"""
+        login_data = {"email": "nobody@example.com", "password": "password123"}
+        response = client.post("/api/auth/login/email", json=login_data)
+        assert response.status_code == 401
+
+    def test_login_rehashes_outdated_hash(self, client, db_session):
+        """Test that a hash made at another bcrypt cost is replaced on login"""
+        # Seed a user whose hash predates the current BCRYPT_ROUNDS
+        legacy_hash = bcrypt.using(rounds=BCRYPT_ROUNDS + 1).hash("legacy123")
+        db_session.add(
+            User(
+                email="legacy@example.com",
+                username="legacy",
+                hashed_password=legacy_hash,
+            )
+        )
+        db_session.commit()
 
+        login_data = {"email": "legacy@example.com", "password": "legacy123"}
+        response = client.post("/api/auth/login/email", json=login_data)
+        assert response.status_code == 200
 
-if __name__ == "__main__":
-    unittest.main()
+        stored_hash = db_session.scalar(
+            select(User.hashed_password).where(User.email == "legacy@example.com")
+        )
+        assert stored_hash != legacy_hash
+        assert not password_needs_rehash(stored_hash)